@@ -21,6 +21,21 @@ def get_managed_objects():
     return manager.GetManagedObjects()
 
 
+def adapter_path(device_path):
+    """The adapter a device (or player, ...) path belongs to."""
+    return '/'.join(device_path.split('/')[:4])
+
+
+def adapter_name(path):
+    """The name (hci0, ...) of the adapter a path belongs to."""
+    return adapter_path(path).rsplit('/', 1)[-1]
+
+
+def is_configured_adapter(path, names):
+    """Whether the adapter of `path` is in `names`; all are if it's empty."""
+    return not names or adapter_name(path) in names
+
+
 def find_adapter():
     objects = get_managed_objects()
     bus = dbus.SystemBus()
@@ -7,7 +7,9 @@ from mopidy.audio.constants import PlaybackState
 from mopidy.core import CoreListener
 from mopidy.core.actor import Core
 
-from mopidy_btaudio.agent import BlueAgent
+from mopidy_btaudio.agent import (
+    BlueAgent, adapter_path, is_configured_adapter,
+)
 
 logger = logging.getLogger('mopidy-btaudio')
 dbus_properties_interface_name = 'org.freedesktop.DBus.Properties'
@@ -40,7 +42,9 @@ class ObjectManager(object):
 
     def remove(self, path):
         logger.info('object removed: %s' % path)
-        del self.objects[path]
+        self.objects.pop(path, None)
+
+        self._remove(path)
 
     def _remove(self, path):
         pass
@@ -62,10 +66,22 @@ class ObjectManager(object):
 class AdapterManager(ObjectManager):
     interface = 'org.bluez.Adapter1'
 
-    def __init__(self, bus, name):
+    def __init__(self, bus, name, adapters=None):
         self.name = name
+        self.adapters = adapters
         super(AdapterManager, self).__init__(bus)
 
+    def is_managed(self, path):
+        """Whether the adapter at `path` is one of the configured ones"""
+        return is_configured_adapter(path, self.adapters)
+
+    def add(self, dbus_object):
+        if not self.is_managed(str(dbus_object.object_path)):
+            logger.info('ignoring adapter: %s', dbus_object.object_path)
+            return
+
+        super(AdapterManager, self).add(dbus_object)
+
     def _added(self, dbus_object):
         self.configure_adapter(dbus_object)
 
@@ -96,18 +112,36 @@ class AdapterManager(ObjectManager):
             )
             int_ob.Set(self.interface, 'Discoverable', False)
 
-    def set_discoverable(self, enable):
-        for path, adapter in self.objects.items():
-            int_ob = dbus.Interface(adapter, dbus_properties_interface_name)
+    def steer(self, devices_connected):
+        """Make only the first adapter without connected devices discoverable
 
-            discoverable = int_ob.Get(self.interface, 'Discoverable')
-            if discoverable == enable:
-                logger.info('discoverable already set to %s [%s]',
-                            enable, path)
-                continue
+        New devices pair with the adapter they discover, so this spreads
+        them across radios; with a single adapter it is discoverable
+        exactly when nothing is connected.
+        """
+        counts = dict((path, 0) for path in self.objects)
+        for device_path in devices_connected:
+            path = adapter_path(device_path)
+            if path in counts:
+                counts[path] += 1
 
-            logger.info('setting discoverable to %s', enable)
-            int_ob.Set(self.interface, 'Discoverable', discoverable)
+        logger.info('connected devices per adapter: %s', counts)
+
+        idle = sorted(path for path, count in counts.items() if not count)
+        for path in self.objects:
+            self.set_discoverable(path, bool(idle) and path == idle[0])
+
+    def set_discoverable(self, path, enable):
+        adapter = self.objects[path]
+        int_ob = dbus.Interface(adapter, dbus_properties_interface_name)
+
+        discoverable = int_ob.Get(self.interface, 'Discoverable')
+        if discoverable == enable:
+            logger.info('discoverable already set to %s [%s]', enable, path)
+            return
+
+        logger.info('setting discoverable to %s [%s]', enable, path)
+        int_ob.Set(self.interface, 'Discoverable', enable)
 
 
 class DeviceManager(ObjectManager):
@@ -119,6 +153,18 @@ class DeviceManager(ObjectManager):
         self._devices_connected = set()
         self._adapter_manager = adapter_manager
 
+    def add(self, dbus_object):
+        path = str(dbus_object.object_path)
+        if not self._adapter_manager.is_managed(adapter_path(path)):
+            logger.info('ignoring device: %s', path)
+            return
+
+        super(DeviceManager, self).add(dbus_object)
+
+    def changed(self, dbus_object):
+        if str(dbus_object.object_path) in self.objects:
+            super(DeviceManager, self).changed(dbus_object)
+
     def _added(self, dbus_object):
         int_ob = dbus.Interface(dbus_object, dbus_properties_interface_name)
         connected = int_ob.Get(self.interface, 'Connected')
@@ -140,6 +186,8 @@ class DeviceManager(ObjectManager):
         self._remove_connected_device(path)
 
     def _start(self):
+        self._connections_updated()
+
         if self._devices_connected:
             return
 
@@ -172,10 +220,7 @@ class DeviceManager(ObjectManager):
         self._connections_updated()
 
     def _connections_updated(self):
-        if self._devices_connected:
-            self._adapter_manager.set_discoverable(False)
-        else:
-            self._adapter_manager.set_discoverable(True)
+        self._adapter_manager.steer(self._devices_connected)
 
 
 class MediaPlayerManager(ObjectManager):
@@ -184,9 +229,26 @@ class MediaPlayerManager(ObjectManager):
     _bt_is_playing = set()
     _mopidy_was_playing = False
 
-    def __init__(self, bus, core):
+    def __init__(self, bus, core, adapter_manager):
         super(MediaPlayerManager, self).__init__(bus)
         self.core = core
+        self._adapter_manager = adapter_manager
+
+    def add(self, dbus_object):
+        path = str(dbus_object.object_path)
+        if not self._adapter_manager.is_managed(adapter_path(path)):
+            logger.info('ignoring media player: %s', path)
+            return
+
+        super(MediaPlayerManager, self).add(dbus_object)
+
+    def changed(self, dbus_object):
+        if str(dbus_object.object_path) in self.objects:
+            super(MediaPlayerManager, self).changed(dbus_object)
+
+    def remove(self, path):
+        if path in self.objects:
+            super(MediaPlayerManager, self).remove(path)
 
     def _get_media_player_status(self, dbus_object):
         int_ob = dbus.Interface(dbus_object, dbus_properties_interface_name)
@@ -248,9 +310,12 @@ class BluetoothManager(object):
         self._bus = dbus.SystemBus()
 
         bt_name = config['btaudio'].get('name')
+        adapters = config['btaudio'].get('adapters')
 
-        self._adapter_manager = AdapterManager(self._bus, bt_name)
-        self._media_player_manager = MediaPlayerManager(self._bus, core)
+        self._adapter_manager = AdapterManager(self._bus, bt_name, adapters)
+        self._media_player_manager = MediaPlayerManager(
+            self._bus, core, self._adapter_manager,
+        )
 
         self.managers = [
             self._adapter_manager,
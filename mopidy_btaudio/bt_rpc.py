@@ -3,6 +3,7 @@ import collections
 import dbus
 import dbus.exceptions
 import dbus.service
+import errno
 import functools
 import gi.repository
 import io
@@ -10,9 +11,11 @@ import json
 import logging
 import os
 import pykka
+import re
 import struct
 import threading
 import time
+import uuid
 
 from mopidy.core import Core
 from mopidy.core import CoreListener
@@ -20,8 +23,17 @@ from mopidy.http.handlers import make_jsonrpc_wrapper
 from mopidy.internal.path import get_or_create_dir
 from mopidy.models.serialize import ModelJSONEncoder
 
+from mopidy_btaudio.agent import adapter_name, is_configured_adapter
+from mopidy_btaudio.extension import BtAudioExtension
+from mopidy_btaudio.profiler import Profiler
+
 log = logging.getLogger(__name__)
 
+# outbound frame priorities, most urgent first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_EVENT = 1
+PRIORITY_BULK = 2
+
 
 def report_exceptions(func):
     @functools.wraps(func)
@@ -65,50 +77,73 @@ class BtRpcServer(pykka.ThreadingActor, CoreListener):
         else:
             image_dir = self.get_data_dir(config)
 
-        self._spp = SerialPort(1)
+        self._images = ImageCache(
+            image_dir, config['btaudio']['artwork_cache_size'],
+        )
+
+        self._profiler = Profiler(BtAudioExtension.get_data_dir(config))
+
+        self._spps = [
+            SerialPort(channel) for channel in config['btaudio']['channels']
+        ]
         self._server = BluetoothServer(
             core,
-            image_dir,
-            dbus.SystemBus(),
-            self._spp.profile_path,
+            self._images,
+            self._profiler,
+            config['btaudio'],
         )
+        for spp in self._spps:
+            self._server.add_profile(spp)
         self._thread = threading.Thread(
             name='bluetooth server',
             target=self.startup,
         )
 
     def startup(self):
-        if not self._spp.register():
+        registered = [spp.register() for spp in self._spps]
+        if not any(registered):
             return
 
+        self._server.start()
         self._mainloop.run()
 
     def shutdown(self):
         self._mainloop.quit()
-        self._spp.unregister()
+        for spp in self._spps:
+            spp.unregister()
 
     @report_exceptions
     def on_start(self):
+        profile_seconds = self.config['btaudio']['profile_seconds']
+        profile_requests = self.config['btaudio']['profile_requests']
+        if profile_seconds or profile_requests:
+            self._profiler.start(profile_seconds, profile_requests)
+
+        self._server.prefetcher.start()
         self._thread.start()
 
     @report_exceptions
     def on_stop(self):
+        self._profiler.stop()
+        self._server.prefetcher.stop()
         self.shutdown()
         self._thread.join(1)
 
     @report_exceptions
     def on_event(self, name, **data):
+        if name in ('track_playback_started', 'tracklist_changed'):
+            self._server.prefetcher.schedule()
+
         event = data
         event['event'] = name
-        message = json.dumps(event, cls=ModelJSONEncoder)
 
-        self._server.broadcast(message)
+        self._server.publish(event)
 
 
 class SerialPort(object):
-    profile_path = "/org/bluez/mopidy"
-
     def __init__(self, channel=1):
+        self.channel = channel
+        self.profile_path = "/org/bluez/mopidy/channel%d" % channel
         self.bus = dbus.SystemBus()
         self.uuid = "1101"
         self.opts = {
@@ -141,21 +176,169 @@ class SerialPort(object):
             log.exception('failed to unregister profile')
 
 
+class AdapterStats(object):
+    """Connection and traffic counters of one Bluetooth adapter.
+
+    Rates are bytes per second over the last completed window of at least
+    `WINDOW` seconds.
+    """
+    WINDOW = 10
+
+    def __init__(self):
+        self.connections = 0
+        self.channels = collections.Counter()
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._window_start = time.time()
+        self._window_read = self._window_written = 0
+        self._read_rate = self._write_rate = 0.0
+
+    def add(self, read=0, written=0):
+        now = time.time()
+        elapsed = now - self._window_start
+        if elapsed >= self.WINDOW:
+            self._read_rate = self._window_read / elapsed
+            self._write_rate = self._window_written / elapsed
+            self._window_start = now
+            self._window_read = self._window_written = 0
+
+        self.bytes_read += read
+        self.bytes_written += written
+        self._window_read += read
+        self._window_written += written
+
+    def to_dict(self):
+        self.add()
+        return {
+            'connections': self.connections,
+            'channels': dict(self.channels),
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'read_rate': self._read_rate,
+            'write_rate': self._write_rate,
+        }
+
+
 class ConnectionInfo(object):
-    def __init__(self, fd):
+    def __init__(self, path, fd, channel=None, stats=None):
+        self.path = path
         self.fd = fd
+        self.channel = channel
+        self.stats = stats or AdapterStats()
+        self.closed = False
         self.msg_len = None
         self.write_lock = threading.Lock()
+        self.watch_ids = []
+        self.out_watch_id = None
+        self.outbox = [
+            collections.deque()
+            for _ in (PRIORITY_INTERACTIVE, PRIORITY_EVENT, PRIORITY_BULK)
+        ]
+        self.sending = None
+        self.last_read = self.last_write = time.time()
+        self.push_images = False
+        self.pushed_images = collections.deque(maxlen=8)
+        self.subscriptions = None
+        # events after this one are sent live, so resume doesn't replay them
+        self.connected_seq = 0
+
+    def wants(self, event):
+        """Whether the event matches one of the client's subscriptions.
+
+        Clients that never subscribed get every event.
+        """
+        if self.subscriptions is None:
+            return True
 
+        for fields in self.subscriptions.get(event['event'], ()):
+            for key, value in fields.items():
+                if _get_field(event, key) != value:
+                    break
+            else:
+                return True
 
-class BtRpc:
-    def __init__(self, image_dir):
+        return False
+
+
+class EventLog(object):
+    """Ring buffer of the most recently broadcast events.
+
+    Events are numbered from 1 within a session, which is new every time
+    the server starts; callers must hold `lock` around `append` and
+    `since` so that replays and new broadcasts don't interleave.
+    """
+
+    def __init__(self, size):
+        self.session = uuid.uuid4().hex
+        self.seq = 0
+        self.lock = threading.Lock()
+        self._events = collections.deque(maxlen=size)
+
+    def append(self, event):
+        self.seq += 1
+        event['seq'] = self.seq
+        self._events.append(event)
+
+    def since(self, seq):
+        """Events after `seq`, or None if some are no longer buffered.
+
+        A `seq` ahead of ours is also None: it is from an earlier session.
+        """
+        if seq > self.seq:
+            return None
+
+        if seq == self.seq:
+            return []
+
+        if not self._events or self._events[0]['seq'] > seq + 1:
+            return None
+
+        return [event for event in self._events if event['seq'] > seq]
+
+
+class ImageCache(object):
+    """Bounded LRU of base64 encoded image data, keyed by image uri."""
+
+    def __init__(self, image_dir, size=8):
         self.image_dir = image_dir
+        self.size = size
+        self._images = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, uri):
+        with self._lock:
+            data = self._images.pop(uri, None)
+            if data is not None:
+                self._images[uri] = data
+                return data
+
+        data = self._load(uri)
+        if data is None or not self.size:
+            return data
+
+        with self._lock:
+            self._images[uri] = data
+            while len(self._images) > self.size:
+                self._images.popitem(last=False)
+
+        return data
+
+    def _load(self, uri):
+        if uri.startswith('/images/'):
+            uri = uri[len('/images/'):]
+
+        # only ever serve files from within image_dir
+        if os.path.isabs(uri) or re.match(r'^[a-zA-Z][\w+.-]*:', uri):
+            log.warning('refusing image uri %r' % uri)
+            return
+
+        image_dir = os.path.realpath(self.image_dir)
+        path = os.path.realpath(os.path.join(image_dir, uri))
+        if not path.startswith(os.path.join(image_dir, '')):
+            log.warning('refusing image uri %r' % uri)
+            return
 
-    def get_image_data(self, uri):
-        uri = uri.lstrip('/images/')
-        path = os.path.join(self.image_dir, uri)
-        if not os.path.exists(path):
+        if not os.path.isfile(path):
             return
 
         with open(path, 'rb') as fp:
@@ -164,12 +347,209 @@ class BtRpc:
         return base64.b64encode(data)
 
 
+class ArtworkPrefetcher(object):
+    """Loads artwork for the current and next tracks in the background.
+
+    Requests are coalesced: however many events arrive while a prefetch is
+    running, only one more pass is made once it finishes.
+    """
+
+    def __init__(self, core, images, push):
+        self.core = core
+        self.images = images
+        self._push = push
+        self._pending = False
+        self._running = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            name='artwork prefetch',
+            target=self._run,
+        )
+        self._thread.daemon = True
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def schedule(self):
+        with self._cond:
+            self._pending = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+
+                if not self._running:
+                    return
+
+                self._pending = False
+
+            self._prefetch()
+
+    @report_exceptions
+    def _prefetch(self):
+        current = self.core.playback.get_current_tl_track().get()
+        next_tl_track = self.core.tracklist.next_track(current).get()
+
+        track_uris = []
+        for tl_track in (current, next_tl_track):
+            if tl_track and tl_track.track.uri not in track_uris:
+                track_uris.append(tl_track.track.uri)
+
+        if not track_uris:
+            return
+
+        images_by_uri = self.core.library.get_images(track_uris).get()
+        for track_uri in track_uris:
+            images = images_by_uri.get(track_uri)
+            if not images:
+                continue
+
+            image_uri = images[0].uri
+            data = self.images.get(image_uri)
+            if data is not None:
+                self._push(track_uri, image_uri, data)
+
+
+class BtRpc:
+    def __init__(self, server, images):
+        self._server = server
+        self._images = images
+
+    def get_image_data(self, uri, offset=0, length=None):
+        data = self._images.get(uri)
+        if data is None or (not offset and length is None):
+            return data
+
+        end = None if length is None else offset + length
+        return data[offset:end]
+
+    def resume(self, seq, session):
+        """Replay the events this client missed after `seq`.
+
+        `session` is the one from the client's previous `resume` reply, or
+        null if it has none. Returns the current `session` and `seq`, and
+        `resync` set if the missed events are no longer buffered or
+        `session` doesn't match (e.g. after a restart), in which case the
+        client must fetch all state again. Only events from before this
+        connection was made are replayed; clients should de-duplicate by
+        `seq`.
+        """
+        return self._server.resume(self._server.current_connection, seq,
+                                   session)
+
+    def subscribe(self, event, fields=None):
+        """Receive `event`, optionally only when its fields match `fields`.
+
+        `fields` maps dotted paths into the event, like
+        `tl_track.track.uri`, to the values they must equal. Once a client
+        subscribes, it only receives the events it subscribed to.
+        """
+        # TypeError is reported as a JSON-RPC invalid params error
+        if not isinstance(event, basestring):
+            raise TypeError('event must be a string')
+
+        if fields is not None and not (
+                isinstance(fields, dict) and
+                all(isinstance(key, basestring) for key in fields)):
+            raise TypeError('fields must be an object')
+
+        info = self._server.current_connection
+        if info.subscriptions is None:
+            info.subscriptions = {}
+
+        info.subscriptions.setdefault(event, []).append(fields or {})
+        return info.subscriptions
+
+    def unsubscribe(self, event=None):
+        """Stop receiving `event`, or drop all subscriptions if omitted.
+
+        Without any subscriptions the client receives every event again.
+        """
+        info = self._server.current_connection
+        if event is None:
+            info.subscriptions = None
+        elif info.subscriptions is not None:
+            info.subscriptions.pop(event, None)
+            if not info.subscriptions:
+                info.subscriptions = None
+
+        return info.subscriptions
+
+    def start_profiling(self, seconds=None, requests=None):
+        """Profile the server until `seconds` or `requests` have passed.
+
+        Returns the path prefix of the files that will be written to the
+        data dir, or None if a profile is already being taken.
+        """
+        return self._server.profiler.start(seconds, requests)
+
+    def stop_profiling(self):
+        return self._server.profiler.stop(wait=False)
+
+    def get_adapter_stats(self):
+        """Connections and throughput of each Bluetooth adapter."""
+        return self._server.adapter_stats()
+
+    def ping(self):
+        """Answer a heartbeat; any request resets the idle timeout."""
+        return True
+
+    def push_images(self, enabled=True):
+        """Push artwork for the current and next tracks to this client."""
+        info = self._server.current_connection
+        info.push_images = bool(enabled)
+        if info.push_images:
+            self._server.prefetcher.schedule()
+
+        return info.push_images
+
+
 class BluetoothServer(dbus.service.Object):
-    def __init__(self, core, image_dir, *args, **kwargs):
+    SUPPORTS_MULTIPLE_OBJECT_PATHS = True
+    HEARTBEAT = json.dumps({'event': 'heartbeat'})
+
+    def __init__(self, core, images, profiler, ext_config, *args, **kwargs):
         super(BluetoothServer, self).__init__(*args, **kwargs)
+        self.profiler = profiler
+        self.heartbeat_interval = ext_config['heartbeat_interval']
+        self.idle_timeout = ext_config['idle_timeout']
+        self.write_timeout = ext_config['write_timeout']
+        if self.heartbeat_interval and self.idle_timeout and (
+                self.idle_timeout <= self.heartbeat_interval):
+            raise ValueError(
+                'btaudio/idle_timeout must be longer than '
+                'btaudio/heartbeat_interval')
+        self.write_slice_size = ext_config['write_slice_size']
+        self.adapters = ext_config['adapters']
         self.jsonrpc = make_jsonrpc_wrapper(core)
-        self.jsonrpc.objects['btrpc'] = BtRpc(image_dir)
+        self.jsonrpc.objects['btrpc'] = BtRpc(self, images)
+        self.prefetcher = ArtworkPrefetcher(core, images, self.push_image)
+        self.events = EventLog(ext_config['event_buffer_size'])
+        self.current_connection = None
         self._connections_by_path = collections.defaultdict(list)
+        self._channels_by_profile = {}
+        self._stats_by_adapter = collections.defaultdict(AdapterStats)
+
+    def add_profile(self, serial_port):
+        """Serve connections made to `serial_port`'s profile"""
+        self.add_to_connection(serial_port.bus, serial_port.profile_path)
+        self._channels_by_profile[serial_port.profile_path] = (
+            serial_port.channel)
+
+    def adapter_stats(self):
+        return dict(
+            (adapter, stats.to_dict())
+            for adapter, stats in self._stats_by_adapter.items()
+        )
 
     @dbus.service.method('org.bluez.Profile1',
                          in_signature='o',
@@ -179,99 +559,372 @@ class BluetoothServer(dbus.service.Object):
 
     def disconnect(self, path):
         log.info('disconnecting: %s', path)
-        for info in self._connections_by_path[path]:
+        for info in self._connections_by_path.pop(path, []):
+            self._close(info)
+
+    def evict(self, path, info):
+        log.info('evicting: %s (#%s)', path, info.fd)
+        infos = self._connections_by_path.get(path, [])
+        if info in infos:
+            infos.remove(info)
+            if not infos:
+                del self._connections_by_path[path]
+
+        self._close(info)
+
+    def _close(self, info):
+        if info.closed:
+            return
+        info.closed = True
+        info.stats.connections -= 1
+        info.stats.channels[info.channel] -= 1
+
+        for watch_id in info.watch_ids:
+            gi.repository.GObject.source_remove(watch_id)
+        del info.watch_ids[:]
+
+        with info.write_lock:
+            if info.out_watch_id is not None:
+                gi.repository.GObject.source_remove(info.out_watch_id)
+                info.out_watch_id = None
+
+            for queue in info.outbox:
+                queue.clear()
+            info.sending = None
+
+        try:
             os.close(info.fd)
-        del self._connections_by_path[path]
+        except OSError:
+            log.debug('#%s: already closed', info.fd)
+
+    def start(self):
+        if self.write_timeout or self.idle_timeout:
+            gi.repository.GObject.timeout_add_seconds(1, self.check_cb)
+
+        if self.heartbeat_interval:
+            gi.repository.GObject.timeout_add_seconds(
+                self.heartbeat_interval, self.heartbeat_cb,
+            )
 
     @dbus.service.method(
         "org.bluez.Profile1", in_signature="oha{sv}", out_signature="",
+        path_keyword='profile_path',
     )
-    def NewConnection(self, path, fd, properties):
+    def NewConnection(self, path, fd, properties, profile_path=None):
         fd = fd.take()
 
-        log.info('NewConnection: %s (#%s)', path, fd)
+        adapter = adapter_name(path)
+        channel = self._channels_by_profile.get(profile_path)
+        log.info('NewConnection: %s (#%s) on %s, channel %s',
+                 path, fd, adapter, channel)
 
-        info = ConnectionInfo(fd=fd)
-        self._connections_by_path[path].append(info)
+        if not is_configured_adapter(path, self.adapters):
+            log.info('#%s: %s is not a configured adapter, closing',
+                     fd, adapter)
+            os.close(fd)
+            return
 
-        gi.repository.GObject.io_add_watch(
+        stats = self._stats_by_adapter[adapter]
+        stats.connections += 1
+        stats.channels[channel] += 1
+
+        info = ConnectionInfo(path=path, fd=fd, channel=channel, stats=stats)
+        with self.events.lock:
+            info.connected_seq = self.events.seq
+            self._connections_by_path[path].append(info)
+
+        info.watch_ids.append(gi.repository.GObject.io_add_watch(
             fd,
             gi.repository.GObject.PRIORITY_DEFAULT,  # condition
             gi.repository.GObject.IO_IN | gi.repository.GObject.IO_PRI,
             functools.partial(self.read_cb, path),
-        )
+        ))
+        info.watch_ids.append(gi.repository.GObject.io_add_watch(
+            fd,
+            gi.repository.GObject.PRIORITY_DEFAULT,
+            gi.repository.GObject.IO_HUP | gi.repository.GObject.IO_ERR,
+            functools.partial(self.hangup_cb, path),
+        ))
+
+    def _get_info(self, path, fd):
+        for info in self._connections_by_path.get(path, []):
+            if info.fd == fd:
+                return info
+
+    def hangup_cb(self, path, fd, conditions):
+        log.info('--> #%s: hung up (%s), closing' % (fd, conditions))
+        info = self._get_info(path, fd)
+        if info is not None:
+            self.evict(path, info)
+
+        return False
+
+    def check_cb(self):
+        now = time.time()
+        for info in self._connections():
+            stalled = (
+                self.write_timeout and
+                info.out_watch_id is not None and
+                now - info.last_write > self.write_timeout
+            )
+            if stalled:
+                log.warning('<-- #%s: stalled for %ds, closing' % (
+                    info.fd, now - info.last_write))
+                self.evict(info.path, info)
+            elif self.idle_timeout and (
+                    now - info.last_read > self.idle_timeout):
+                log.warning('--> #%s: idle for %ds, closing' % (
+                    info.fd, now - info.last_read))
+                self.evict(info.path, info)
+
+        return True
+
+    def heartbeat_cb(self):
+        now = time.time()
+        for info in self._connections():
+            if now - info.last_write >= self.heartbeat_interval:
+                self.write_cb(info.path, info.fd, self.HEARTBEAT)
+
+        return True
 
     def read_cb(self, path, fd, conditions):
+        info = self._get_info(path, fd)
+        if info is None:
+            log.warning('--> #%s: no info, bailing' % fd)
+            return False
+
         try:
             log.debug('--> #%s: reading header' % fd)
-            data = _io_retry(os.read, fd, 4)
+            data = _io_retry(os.read, fd, 4, self.write_timeout)
 
             size, = struct.unpack('!I', data)
             log.debug('--> #%s: reading %s bytes' % (fd, size))
 
-            data = _io_retry(os.read, fd, size)
+            data = _io_retry(os.read, fd, size, self.write_timeout)
             log.debug('--> #%s: %s' % (fd, data))
+            info.stats.add(read=4 + len(data))
         except:
             log.exception('--> #%s: error reading, closing' % fd)
-            self.disconnect(path)
+            self.evict(path, info)
             return False
 
-        response = self.jsonrpc.handle_json(data)
+        info.last_read = time.time()
+
+        self.current_connection = info
+        try:
+            with self.profiler.request(data):
+                response = self.jsonrpc.handle_json(data)
+        finally:
+            self.current_connection = None
 
         if response:
-            self.write_cb(path, fd, response)
+            # large replies (e.g. image data) mustn't hold up small ones
+            if len(response) > self.write_slice_size:
+                priority = PRIORITY_BULK
+            else:
+                priority = PRIORITY_INTERACTIVE
+            self.write_cb(path, fd, response, priority)
 
         return True
 
-    def broadcast(self, value):
-        log.info('broadcasting %s' % (value))
+    def _connections(self):
+        return [
+            info
+            for infos in list(self._connections_by_path.values())
+            for info in infos
+        ]
+
+    def publish(self, event):
+        """Broadcast an event to the clients subscribed to it.
+
+        The event is only serialized if at least one client wants it.
+        """
+        with self.events.lock:
+            self.events.append(event)
+
+            infos = [info for info in self._connections() if info.wants(event)]
+            if not infos:
+                log.debug('no subscribers for %s' % event['event'])
+                return
+
+            message = json.dumps(event, cls=ModelJSONEncoder)
+            log.info('broadcasting %s' % (message))
+            for info in infos:
+                self.write_cb(info.path, info.fd, message)
+
+    def resume(self, info, seq, session):
+        with self.events.lock:
+            if session != self.events.session:
+                events = None
+            else:
+                events = self.events.since(seq)
+
+            if events is None:
+                log.info('#%s: cannot resume from %s, resync' % (info.fd, seq))
+            else:
+                events = [
+                    event for event in events
+                    if event['seq'] <= info.connected_seq and info.wants(event)
+                ]
+                log.info('#%s: replaying %s events' % (info.fd, len(events)))
+                for event in events:
+                    message = json.dumps(event, cls=ModelJSONEncoder)
+                    self.write_cb(info.path, info.fd, message)
+
+            return {
+                'session': self.events.session,
+                'seq': self.events.seq,
+                'resync': events is None,
+            }
+
+    def push_image(self, track_uri, image_uri, data):
+        """Push image data to opted-in clients, split into bulk slices.
+
+        Each `image_data` event carries the `offset` of its slice within
+        the `total` length, so other frames can go out in between.
+        """
+        messages = None
         items = list(self._connections_by_path.items())
         for path, infos in items:
             for info in infos:
-                self.write_cb(path, info.fd, value)
-
-    def write_cb(self, path, fd, value):
-        infos = self._connections_by_path.get(path, [])
-        for info in infos:
-            if info.fd == fd:
-                break
-        else:
+                if not info.push_images or image_uri in info.pushed_images:
+                    continue
+
+                if messages is None:
+                    messages = self._image_messages(
+                        track_uri, image_uri, data,
+                    )
+
+                log.debug('<-- #%s: pushing %s' % (info.fd, image_uri))
+                info.pushed_images.append(image_uri)
+                for message in messages:
+                    self.write_cb(path, info.fd, message, PRIORITY_BULK)
+
+    def _image_messages(self, track_uri, image_uri, data):
+        """Split image data into `image_data` events of one slice each."""
+        def message(offset, piece):
+            return json.dumps({
+                'event': 'image_data',
+                'track_uri': track_uri,
+                'uri': image_uri,
+                'offset': offset,
+                'total': len(data),
+                'data': piece,
+            })
+
+        # the largest envelope, plus the length header, must fit too
+        overhead = len(message(len(data), '')) + 4
+        step = self.write_slice_size - overhead
+        if step < 1:
+            step = self.write_slice_size
+
+        return [
+            message(offset, data[offset:offset + step])
+            for offset in range(0, len(data), step)
+        ]
+
+    def write_cb(self, path, fd, value, priority=PRIORITY_EVENT):
+        """Queue a message for the connection, sent from the GLib loop.
+
+        Frames go out in FIFO order within their priority; large ones are
+        written a slice at a time, but never change priority, since events
+        must reach the client in `seq` order.
+        """
+        info = self._get_info(path, fd)
+        if info is None:
             log.warning('--> #%s: no info, bailing' % fd)
             return
 
-        try:
-            info.write_lock.acquire()
-            data = value.encode('utf-8')
-            buf = io.BytesIO()
-            buf.write(to_msg_size(data))
-            buf.write(data)
-
-            remaining = buf.getvalue()
-
-            while remaining:
-                try:
-                    log.debug('<-- #%s: sending %s bytes' % (fd, len(remaining)))
-                    written = _io_retry(os.write, fd, remaining)
-                    log.debug('<-- #%s: sent %s bytes' % (fd, written))
-                    remaining = remaining[written:]
-                except:
-                    log.exception('<-- #%s: failed to write, closing socket' % fd)
-                    self.disconnect(path)
-                    return
-        finally:
-            info.write_lock.release()
+        data = value.encode('utf-8')
+        buf = io.BytesIO()
+        buf.write(to_msg_size(data))
+        buf.write(data)
+        frame = buf.getvalue()
+
+        with info.write_lock:
+            if info.closed:
+                log.debug('<-- #%s: closed, dropping frame' % fd)
+                return
+
+            info.outbox[priority].append(frame)
+            if info.out_watch_id is None:
+                info.last_write = time.time()
+                info.out_watch_id = gi.repository.GObject.io_add_watch(
+                    fd,
+                    gi.repository.GObject.PRIORITY_DEFAULT,
+                    gi.repository.GObject.IO_OUT,
+                    functools.partial(self.flush_cb, path),
+                )
+
+    def flush_cb(self, path, fd, conditions):
+        info = self._get_info(path, fd)
+        if info is None:
+            return False
+
+        with info.write_lock:
+            if not info.sending:
+                for queue in info.outbox:
+                    if queue:
+                        info.sending = queue.popleft()
+                        break
+                else:
+                    info.out_watch_id = None
+                    return False
+
+            chunk = info.sending[:self.write_slice_size]
+            try:
+                log.debug('<-- #%s: sending %s bytes' % (fd, len(chunk)))
+                written = os.write(fd, chunk)
+                log.debug('<-- #%s: sent %s bytes' % (fd, written))
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return True
+
+                log.exception('<-- #%s: failed to write, closing socket' % fd)
+                info.out_watch_id = None
+                failed = True
+            else:
+                info.sending = info.sending[written:]
+                info.last_write = time.time()
+                info.stats.add(written=written)
+                failed = False
+
+        if failed:
+            self.evict(path, info)
+            return False
+
+        return True
 
 
-def _io_retry(func, *args):
+def _io_retry(func, fd, arg, timeout=None):
+    """Retry a non-blocking read until it makes progress.
+
+    Gives up with ETIMEDOUT once `timeout` seconds pass without progress,
+    so a peer that stopped mid-message can't block us forever.
+    """
+    deadline = timeout and time.time() + timeout
     while True:
         try:
-            return func(*args)
+            return func(fd, arg)
         except OSError as e:
-            if e.errno == 11:
-                time.sleep(.005)  # don't spin
-                continue
+            if e.errno != errno.EAGAIN:
+                raise
 
-            raise
+            if deadline and time.time() > deadline:
+                raise OSError(errno.ETIMEDOUT, os.strerror(errno.ETIMEDOUT))
+
+            time.sleep(.005)  # don't spin
+
+
+def _get_field(event, path):
+    value = event
+    for key in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(key)
+        else:
+            value = getattr(value, key, None)
+
+    return value
 
 
 def to_msg_size(data):
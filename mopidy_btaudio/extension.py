@@ -1,11 +1,36 @@
 import pkg_resources
 
-from mopidy.config import String
+from mopidy.config import Integer, List, String
 from mopidy.ext import Extension
 
 from . import __version__
 
 
+class ChannelList(List):
+    """List of RFCOMM channels, 1 to 30, with duplicates removed"""
+
+    def deserialize(self, value):
+        channels = []
+        for channel in super(ChannelList, self).deserialize(value):
+            try:
+                channel = int(channel)
+            except ValueError:
+                raise ValueError('%r is not a channel number' % channel)
+
+            if not 1 <= channel <= 30:
+                raise ValueError('channel %d is not in 1-30' % channel)
+
+            if channel not in channels:
+                channels.append(channel)
+
+        return tuple(channels)
+
+    def serialize(self, value, display=False):
+        return super(ChannelList, self).serialize(
+            [u'%d' % channel for channel in value or ()], display,
+        )
+
+
 class BtAudioExtension(Extension):
     dist_name = 'Mopidy-BtAudio'
     ext_name = 'btaudio'
@@ -20,6 +45,16 @@ class BtAudioExtension(Extension):
         schema = super(BtAudioExtension, self).get_config_schema()
         schema['name'] = String(optional=True)
         schema['pin'] = String()
+        schema['adapters'] = List(optional=True)
+        schema['channels'] = ChannelList()
+        schema['artwork_cache_size'] = Integer(minimum=0)
+        schema['heartbeat_interval'] = Integer(minimum=0)
+        schema['idle_timeout'] = Integer(minimum=0)
+        schema['write_timeout'] = Integer(minimum=1)
+        schema['write_slice_size'] = Integer(minimum=64)
+        schema['event_buffer_size'] = Integer(minimum=0)
+        schema['profile_seconds'] = Integer(minimum=0)
+        schema['profile_requests'] = Integer(minimum=0)
         return schema
 
     def setup(self, registry):
@@ -0,0 +1,230 @@
+import cProfile
+import collections
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Profiler(object):
+    """On-demand profiler for the Bluetooth RPC server.
+
+    While running, a background thread samples the stacks of every other
+    thread (the GLib loop, the pykka actors, ...) and every JSON-RPC
+    request is run under cProfile. Samples taken while a request is being
+    handled are attributed to its method. Once stopped, by hand or after
+    the given number of seconds or requests, it writes to `output_dir`:
+
+    - `<name>.folded`: collapsed stacks, for flamegraph.pl or speedscope
+    - `<name>-<method>.prof`: cProfile stats of each JSON-RPC method
+    - `<name>-requests.json`: request count and timings of each method
+    """
+
+    def __init__(self, output_dir, interval=0.005):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.name = None
+
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._active = False
+        self._deadline = None
+        self._requests_left = None
+        self._method = None
+
+        self._stacks = collections.Counter()
+        self._profiles = {}
+        self._timings = {}
+
+    def start(self, seconds=None, requests=None):
+        """Start profiling, returning the path prefix of the output files.
+
+        Returns None if the profiler is already running.
+        """
+        # TypeError is reported as a JSON-RPC invalid params error
+        for value in (seconds, requests):
+            valid = value is None or (
+                isinstance(value, (int, long, float)) and
+                not isinstance(value, bool) and
+                value >= 0
+            )
+            if not valid:
+                raise TypeError(
+                    'seconds and requests must be non-negative numbers')
+
+        if self._active:
+            return
+
+        with self._cond:
+            if self._active:
+                return
+
+            self._stopping.clear()
+            self._deadline = seconds and time.time() + seconds
+            self._requests_left = requests or None
+            self._stacks.clear()
+            self._profiles.clear()
+            self._timings.clear()
+            self.name = os.path.join(
+                self.output_dir, time.strftime('btrpc-%Y%m%d-%H%M%S'),
+            )
+            self._active = True
+
+        log.info('profiling for %s seconds, %s requests', seconds, requests)
+
+        self._thread = threading.Thread(
+            name='btrpc profiler',
+            target=self._run,
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        return self.name
+
+    def stop(self, wait=True):
+        """Stop profiling, returning the path prefix of the output files.
+
+        The files are written by the sampling thread once the request
+        being profiled has finished, so a request handler must not wait.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+
+        self._stopping.set()
+        if wait:
+            thread.join()
+
+        return self.name
+
+    @contextlib.contextmanager
+    def request(self, data):
+        """Profile the handling of the JSON-RPC request `data`."""
+        if not self._active:
+            yield
+            return
+
+        with self._cond:
+            profiling = (
+                self._active and
+                not self._stopping.is_set() and
+                self._method is None
+            )
+            if profiling:
+                method = self._method = _get_method(data)
+                profile = self._profiles.get(method)
+                if profile is None:
+                    profile = self._profiles[method] = cProfile.Profile()
+
+        if not profiling:
+            yield
+            return
+
+        start = time.time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.time() - start
+
+            with self._cond:
+                self._method = None
+                self._add_timing(method, elapsed)
+
+                if self._requests_left is not None:
+                    self._requests_left -= 1
+                    if self._requests_left <= 0:
+                        self._stopping.set()
+
+                self._cond.notify_all()
+
+    def _add_timing(self, method, elapsed):
+        timing = self._timings.setdefault(
+            method, {'count': 0, 'total': 0.0, 'max': 0.0},
+        )
+        timing['count'] += 1
+        timing['total'] += elapsed
+        timing['max'] = max(timing['max'], elapsed)
+
+    def _run(self):
+        ident = threading.current_thread().ident
+        while not self._stopping.wait(self.interval):
+            if self._deadline and time.time() >= self._deadline:
+                break
+
+            self._sample(ident)
+
+        with self._cond:
+            # a request's profile can't be dumped while it is enabled
+            while self._method is not None:
+                self._cond.wait()
+
+            try:
+                self._dump()
+            except Exception:
+                log.exception('failed to write profile')
+
+            self._active = False
+            self._thread = None
+
+    def _sample(self, own_ident):
+        names = dict(
+            (thread.ident, thread.name) for thread in threading.enumerate()
+        )
+        method = self._method
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s (%s:%d)' % (
+                    code.co_name,
+                    os.path.basename(code.co_filename),
+                    code.co_firstlineno,
+                ))
+                frame = frame.f_back
+
+            if method is not None:
+                stack.append('[%s]' % method)
+            stack.append(names.get(ident, str(ident)).replace(' ', '_'))
+
+            self._stacks[';'.join(reversed(stack))] += 1
+
+    def _dump(self):
+        with open(self.name + '.folded', 'w') as fp:
+            for stack, count in sorted(self._stacks.items()):
+                fp.write('%s %d\n' % (stack, count))
+
+        for method, profile in self._profiles.items():
+            filename = re.sub(r'[^\w.-]', '_', method)
+            profile.dump_stats('%s-%s.prof' % (self.name, filename))
+
+        with open(self.name + '-requests.json', 'w') as fp:
+            json.dump(self._timings, fp, indent=2, sort_keys=True)
+
+        log.info('profile written to %s', self.name)
+
+
+def _get_method(data):
+    try:
+        request = json.loads(data)
+    except ValueError:
+        return 'invalid'
+
+    if isinstance(request, list):
+        return 'batch'
+
+    if isinstance(request, dict) and request.get('method'):
+        return str(request['method'])
+
+    return 'invalid'